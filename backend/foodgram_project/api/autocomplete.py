@@ -0,0 +1,114 @@
+import bisect
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count
+
+from api.cache import get_version
+from recipes.models import Ingredient
+
+PREFIX_END = '\U0010ffff'
+
+
+class IngredientIndex:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.keys = []
+        self.items = {}
+        self.usage = {}
+        self.built_at = None
+        self.version = None
+
+    def build(self, version=None):
+        keys = []
+        items = {}
+        usage = {}
+        ingredients = Ingredient.objects.annotate(
+            usage=Count('ingredientrecipes')
+        ).values_list('id', 'name', 'measurement_unit', 'usage')
+        for pk, name, measurement_unit, count in ingredients.iterator():
+            keys.append((name.casefold(), pk))
+            items[pk] = self.item(pk, name, measurement_unit)
+            usage[pk] = count
+        keys.sort()
+        with self.lock:
+            self.keys = keys
+            self.items = items
+            self.usage = usage
+            self.built_at = time.monotonic()
+            self.version = version
+
+    def ensure_built(self):
+        version = get_version(Ingredient)
+        if (
+            self.built_at is None
+            or self.version != version
+            or time.monotonic() - self.built_at > self.ttl
+        ):
+            self.build(version)
+
+    @staticmethod
+    def item(pk, name, measurement_unit):
+        return {
+            'id': pk,
+            'name': name,
+            'measurement_unit': measurement_unit
+        }
+
+    def _discard(self, pk):
+        item = self.items.pop(pk, None)
+        if item is None:
+            return
+        key = (item['name'].casefold(), pk)
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def _advance(self, previous, version):
+        if self.version == previous:
+            self.version = version
+
+    def update(self, ingredient, previous, version):
+        with self.lock:
+            if self.built_at is None:
+                return
+            self._discard(ingredient.pk)
+            bisect.insort(
+                self.keys, (ingredient.name.casefold(), ingredient.pk)
+            )
+            self.items[ingredient.pk] = self.item(
+                ingredient.pk, ingredient.name, ingredient.measurement_unit
+            )
+            self.usage.setdefault(ingredient.pk, 0)
+            self._advance(previous, version)
+
+    def remove(self, pk, previous, version):
+        with self.lock:
+            self._discard(pk)
+            self.usage.pop(pk, None)
+            self._advance(previous, version)
+
+    def search(self, prefix='', limit=None):
+        self.ensure_built()
+        prefix = prefix.casefold()
+        with self.lock:
+            if not prefix:
+                keys = self.keys[:limit]
+                return [self.items[pk] for _, pk in keys]
+            start = bisect.bisect_left(self.keys, (prefix,))
+            end = bisect.bisect_left(self.keys, (prefix + PREFIX_END,))
+            matches = [
+                (-self.usage[pk], name, pk)
+                for name, pk in self.keys[start:end]
+            ]
+            if limit is not None:
+                matches = heapq.nsmallest(limit, matches)
+            else:
+                matches.sort()
+            return [self.items[pk] for _, _, pk in matches]
+
+
+ingredient_index = IngredientIndex(ttl=settings.INGREDIENT_INDEX_TTL)
@@ -0,0 +1,94 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def version_key(model):
+    return f'api-version:{model._meta.label_lower}'
+
+
+def current_second():
+    return int(time.time())
+
+
+def get_version(model):
+    return cache.get_or_set(version_key(model), current_second, None)
+
+
+def bump_version(model):
+    key = version_key(model)
+    version = max(int(cache.get(key, 0)) + 1, current_second())
+    cache.set(key, version, None)
+    return version
+
+
+def fragment_key(model, pk, updated_at, versions):
+    return (
+        f'api-fragment:{model._meta.label_lower}:{pk}:'
+        f'{updated_at.timestamp()}:{versions}'
+    )
+
+
+def cached_fragments(model, dependencies, updated, build):
+    versions = ':'.join(str(get_version(other)) for other in dependencies)
+    keys = {
+        pk: fragment_key(model, pk, updated_at, versions)
+        for pk, updated_at in updated.items()
+    }
+    cached = cache.get_many(keys.values())
+    fragments = {
+        pk: cached[key] for pk, key in keys.items() if key in cached
+    }
+    misses = [pk for pk in keys if pk not in fragments]
+    if misses:
+        fresh = build(misses)
+        cache.set_many(
+            {keys[pk]: fragment for pk, fragment in fresh.items()},
+            settings.API_RESPONSE_CACHE_TIMEOUT
+        )
+        fragments.update(fresh)
+    return fragments
+
+
+class VersionedCacheMixin:
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        model = self.get_queryset().model
+        version = get_version(model)
+        digest = hashlib.md5(
+            f'{version}:{request.accepted_media_type}:'
+            f'{request.get_full_path()}'.encode()
+        ).hexdigest()
+        etag = quote_etag(digest)
+        last_modified = int(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = f'api-response:{model._meta.label_lower}:{digest}'
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(
+                    key, response.data, settings.API_RESPONSE_CACHE_TIMEOUT
+                )
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -1,13 +1,15 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework
 
 from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
 
 
 class RecipeFilter(rest_framework.FilterSet):
     tags = rest_framework.filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug'
+        to_field_name='slug',
+        method='tags_filter'
     )
     author = rest_framework.CharFilter(
         field_name='author__id',
@@ -18,6 +20,22 @@ class RecipeFilter(rest_framework.FilterSet):
     is_in_shopping_cart = rest_framework.filters.NumberFilter(
         method='is_in_shopping_cart_filter'
     )
+    search = rest_framework.CharFilter(
+        method='search_filter'
+    )
+
+    def tags_filter(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag__in=value
+            )
+        ))
+
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
 
     def is_favorited_filter(self, queryset, name, value):
         if bool(value):
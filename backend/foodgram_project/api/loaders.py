@@ -0,0 +1,70 @@
+from django.db.models import CharField, Value
+
+from recipes.models import Favorite, ShoppingCart, Subscribe
+
+RELATIONS = {
+    'is_subscribed': (Subscribe, 'subscribing'),
+    'is_favorited': (Favorite, 'recipe'),
+    'is_in_shopping_cart': (ShoppingCart, 'recipe'),
+}
+
+
+class RelationLoader:
+    def __init__(self, user):
+        self.user = user
+        self.pending = {relation: set() for relation in RELATIONS}
+        self.loaded = {relation: {} for relation in RELATIONS}
+
+    @classmethod
+    def from_context(cls, context):
+        loader = context.get('relations')
+        if loader is None:
+            request = context.get('request')
+            loader = getattr(request, 'relation_loader', None)
+            if loader is None:
+                loader = cls(getattr(request, 'user', None))
+                if request is not None:
+                    request.relation_loader = loader
+            context['relations'] = loader
+        return loader
+
+    @property
+    def is_anonymous(self):
+        return self.user is None or not self.user.is_authenticated
+
+    def register(self, relation, pk):
+        if pk not in self.loaded[relation]:
+            self.pending[relation].add(pk)
+
+    def set(self, relation, pk, value):
+        self.pending[relation].discard(pk)
+        self.loaded[relation][pk] = value
+
+    def get(self, relation, pk):
+        if self.is_anonymous:
+            return False
+        if pk not in self.loaded[relation]:
+            self.pending[relation].add(pk)
+            self.load()
+        return self.loaded[relation][pk]
+
+    def load(self):
+        queries = []
+        for relation, ids in self.pending.items():
+            if not ids:
+                continue
+            model, field = RELATIONS[relation]
+            queries.append(model.objects.filter(
+                user=self.user, **{f'{field}__in': list(ids)}
+            ).annotate(
+                relation=Value(relation, output_field=CharField())
+            ).values_list(field, 'relation').order_by())
+            self.loaded[relation].update(dict.fromkeys(ids, False))
+            ids.clear()
+        if not queries:
+            return
+        query = queries[0]
+        if len(queries) > 1:
+            query = query.union(*queries[1:], all=True)
+        for pk, relation in query:
+            self.loaded[relation][pk] = True
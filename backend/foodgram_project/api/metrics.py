@@ -0,0 +1,184 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+METRICS = {
+    'request_duration_seconds': (
+        'Время обработки запроса', DURATION_BUCKETS
+    ),
+    'view_duration_seconds': ('Время работы view', DURATION_BUCKETS),
+    'sql_duration_seconds': ('Время выполнения SQL', DURATION_BUCKETS),
+    'serializer_duration_seconds': (
+        'Время сериализации', DURATION_BUCKETS
+    ),
+    'render_duration_seconds': ('Время рендеринга ответа', DURATION_BUCKETS),
+    'sql_queries': ('Число SQL-запросов', QUERY_BUCKETS),
+}
+PREFIX = 'foodgram_'
+
+current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoint = 'unmatched'
+        self.queries = 0
+        self.sql = 0.0
+        self.serializer = 0.0
+        self.serializer_depth = 0
+        self.view_started = None
+        self.view = None
+        self.render = None
+        self.total = None
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def start_view(self, endpoint):
+        self.endpoint = endpoint
+        self.view_started = time.perf_counter()
+
+    def finish_view(self):
+        if self.view_started is not None and self.view is None:
+            self.view = time.perf_counter() - self.view_started
+
+    def rendered(self, response):
+        if self.view is not None and self.render is None:
+            self.render = (
+                time.perf_counter() - self.view_started - self.view
+            )
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def observations(self):
+        observations = {
+            'request_duration_seconds': self.total,
+            'view_duration_seconds': self.view,
+            'sql_duration_seconds': self.sql,
+            'serializer_duration_seconds': self.serializer,
+            'render_duration_seconds': self.render,
+            'sql_queries': self.queries,
+        }
+        return {
+            name: value for name, value in observations.items()
+            if value is not None
+        }
+
+    def server_timing(self):
+        stages = (
+            ('sql', self.sql, f'{self.queries} queries'),
+            ('serializer', self.serializer, None),
+            ('view', self.view, None),
+            ('render', self.render, None),
+            ('total', self.total, None),
+        )
+        return ', '.join(
+            f'{name};dur={value * 1000:.1f}'
+            + (f';desc="{description}"' if description else '')
+            for name, value, description in stages if value is not None
+        )
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, metrics):
+        with self.lock:
+            for name, value in metrics.observations().items():
+                buckets = METRICS[name][1]
+                key = (name, metrics.endpoint)
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = {
+                        'buckets': [0] * (len(buckets) + 1),
+                        'sum': 0,
+                        'count': 0,
+                    }
+                histogram['buckets'][bisect.bisect_left(buckets, value)] += 1
+                histogram['sum'] += value
+                histogram['count'] += 1
+
+    def render(self):
+        with self.lock:
+            histograms = {
+                key: {**value, 'buckets': list(value['buckets'])}
+                for key, value in self.histograms.items()
+            }
+        lines = []
+        for name, (description, buckets) in METRICS.items():
+            metric = PREFIX + name
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} histogram')
+            for (key, endpoint), histogram in sorted(histograms.items()):
+                if key != name:
+                    continue
+                label = f'endpoint="{endpoint}"'
+                cumulative = 0
+                for bound, count in zip(
+                    (*buckets, '+Inf'), histogram['buckets']
+                ):
+                    cumulative += count
+                    lines.append(
+                        f'{metric}_bucket{{{label},le="{bound}"}} '
+                        f'{cumulative}'
+                    )
+                lines.append(f'{metric}_sum{{{label}}} {histogram["sum"]}')
+                lines.append(
+                    f'{metric}_count{{{label}}} {histogram["count"]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def track_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute(execute, sql, params, many, context)
+
+
+def render_response(response):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.finish_view()
+        response.add_post_render_callback(metrics.rendered)
+    return response.render()
+
+
+@contextmanager
+def serializer_timer():
+    metrics = current_metrics.get()
+    if metrics is None or metrics.serializer_depth:
+        yield
+        return
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer += time.perf_counter() - started
+        metrics.serializer_depth -= 1
+
+
+class TimedSerializerMixin:
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
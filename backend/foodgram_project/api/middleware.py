@@ -0,0 +1,57 @@
+import asyncio
+
+from django.utils.deprecation import MiddlewareMixin
+
+from api.metrics import RequestMetrics, current_metrics, registry
+
+
+def endpoint_name(request, view_func):
+    actions = getattr(view_func, 'actions', None)
+    initkwargs = getattr(view_func, 'initkwargs', {})
+    if actions and initkwargs.get('basename'):
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f'{initkwargs["basename"]}.{action}'
+    match = request.resolver_match
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(metrics, response)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(metrics, response)
+
+    @staticmethod
+    def finish(metrics, response):
+        metrics.finish_view()
+        metrics.finish()
+        registry.observe(metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.start_view(endpoint_name(request, view_func))
+
+    def process_template_response(self, request, response):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.finish_view()
+            response.add_post_render_callback(metrics.rendered)
+        return response
@@ -1,4 +1,10 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
 
 
 class CustomPagination(PageNumberPagination):
@@ -7,3 +13,101 @@ class CustomPagination(PageNumberPagination):
 
 class ShowRecipePagination(PageNumberPagination):
     page_size_query_param = 'recipes_limit'
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    keyset = ('pub_date', 'id')
+    keyset_parsers = (parse_datetime, int)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        prefix = '' if reverse else '-'
+        queryset = queryset.order_by(
+            *(prefix + field for field in self.keyset)
+        )
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self.keyset_filter(self.cursor.position, reverse)
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None:
+            return None
+        try:
+            position = json.loads(cursor.position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+            len(position) != len(self.keyset)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                parse(value)
+                for parse, value in zip(self.keyset_parsers, position)
+            ]
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def keyset_filter(self, position, reverse):
+        lookup = 'gt' if reverse else 'lt'
+        condition = Q()
+        for index in reversed(range(len(self.keyset))):
+            equal = {
+                field: value
+                for field, value in zip(self.keyset[:index], position)
+            }
+            condition |= Q(
+                **equal,
+                **{f'{self.keyset[index]}__{lookup}': position[index]}
+            )
+        return condition
+
+    def get_position(self, instance):
+        return json.dumps([
+            str(
+                instance[field] if isinstance(instance, dict)
+                else getattr(instance, field)
+            )
+            for field in self.keyset
+        ])
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=self.get_position(self.page[-1])
+        ))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True, position=self.get_position(self.page[0])
+        ))
+
+
+class FeedPagination(KeysetPagination):
+    keyset = ('pub_date', 'recipe_id')
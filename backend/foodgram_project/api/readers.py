@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from api.cache import cached_fragments
+from api.loaders import RelationLoader
+from api.metrics import serializer_timer
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+ROW_FIELDS = ('id', 'author_id', 'updated_at', 'pub_date')
+RECIPE_FIELDS = (
+    'id',
+    'tags',
+    'author',
+    'ingredients',
+    'is_favorited',
+    'is_in_shopping_cart',
+    'name',
+    'image',
+    'text',
+    'cooking_time'
+)
+FRAGMENT_DEPENDENCIES = (Tag, Ingredient)
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+
+
+def recipe_rows(queryset):
+    return queryset.values(*ROW_FIELDS)
+
+
+def overlay(fragment, loader, request):
+    data = {field: fragment.get(field) for field in RECIPE_FIELDS}
+    data['author'] = {
+        **fragment['author'],
+        'is_subscribed': loader.get('is_subscribed', fragment['author']['id'])
+    }
+    data['is_favorited'] = loader.get('is_favorited', fragment['id'])
+    data['is_in_shopping_cart'] = loader.get(
+        'is_in_shopping_cart', fragment['id']
+    )
+    if data['image'] and request is not None:
+        data['image'] = request.build_absolute_uri(data['image'])
+    return data
+
+
+def build_fragments(ids):
+    recipes = list(Recipe.objects.filter(id__in=ids).order_by().values(
+        'id', 'author_id', 'name', 'image', 'text', 'cooking_time'
+    ))
+    authors = {
+        author['id']: author
+        for author in User.objects.filter(
+            id__in={recipe['author_id'] for recipe in recipes}
+        ).order_by().values(*AUTHOR_FIELDS)
+    }
+    tags = defaultdict(list)
+    for recipe_id, *values in Recipe.tags.through.objects.filter(
+        recipe_id__in=ids
+    ).order_by('tag__name').values_list(
+        'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+    ):
+        tags[recipe_id].append(dict(zip(TAG_FIELDS, values)))
+    ingredients = defaultdict(list)
+    for recipe_id, *values in IngredientRecipe.objects.filter(
+        recipe_id__in=ids
+    ).values_list(
+        'recipe_id',
+        'ingredient__id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount'
+    ):
+        ingredients[recipe_id].append(dict(zip(INGREDIENT_FIELDS, values)))
+    storage = Recipe._meta.get_field('image').storage
+    return {
+        recipe['id']: {
+            'id': recipe['id'],
+            'tags': tags[recipe['id']],
+            'author': authors[recipe['author_id']],
+            'ingredients': ingredients[recipe['id']],
+            'name': recipe['name'],
+            'image': storage.url(recipe['image']) if recipe['image'] else None,
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+        }
+        for recipe in recipes
+    }
+
+
+class RecipeReader:
+    def __init__(self, context):
+        self.request = context.get('request')
+        self.loader = RelationLoader.from_context(context)
+
+    def represent(self, rows):
+        with serializer_timer():
+            rows = list(rows)
+            fragments = cached_fragments(
+                Recipe,
+                FRAGMENT_DEPENDENCIES,
+                {row['id']: row['updated_at'] for row in rows},
+                build_fragments
+            )
+            for row in rows:
+                self.loader.register('is_favorited', row['id'])
+                self.loader.register('is_in_shopping_cart', row['id'])
+                self.loader.register('is_subscribed', row['author_id'])
+            return [
+                overlay(fragments[row['id']], self.loader, self.request)
+                for row in rows if row['id'] in fragments
+            ]
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import hashlib
+import random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+PRIMARY_MODELS = ('authtoken.token', 'sessions.session')
+
+
+def pin_key(identity):
+    return 'db-pin:' + hashlib.sha256(identity.encode()).hexdigest()
+
+
+def pin_keys(request):
+    address = request.META.get(
+        'HTTP_X_REAL_IP', request.META.get('REMOTE_ADDR', '')
+    )
+    keys = [pin_key('address:' + address)]
+    credentials = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if credentials:
+        keys.append(pin_key('credentials:' + credentials))
+    return keys
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = read_alias.set(self.choose_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        token = read_alias.set(
+            await sync_to_async(self.choose_alias)(request)
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        await sync_to_async(self.pin)(request)
+        return response
+
+    @staticmethod
+    def choose_alias(request):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and not cache.get_many(pin_keys(request))
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    @staticmethod
+    def pin(request):
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            cache.set_many(
+                dict.fromkeys(pin_keys(request), True),
+                settings.READ_YOUR_WRITES_TIMEOUT
+            )
@@ -1,18 +1,45 @@
 import base64
+import binascii
+from collections import defaultdict
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import models, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
+from PIL import Image, ImageFile
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
+from api.cache import cached_fragments
+from api.loaders import RelationLoader
+from api.metrics import TimedSerializerMixin
 from api.paginations import ShowRecipePagination
-from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Subscribe, Tag)
+from api.readers import FRAGMENT_DEPENDENCIES, overlay
+from recipes.feed import fan_out
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, ShoppingCart,
+                            Tag)
+from recipes.shopping_list import change_shopping_list
 from users.models import User
 
+BASE64_CHUNK_SIZE = 64 * 1024
+BULK_IDS_LIMIT = 100
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class RelationListSerializer(TimedListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        items = list(iterable)
+        loader = RelationLoader.from_context(self.context)
+        for item in items:
+            self.child.register_relations(loader, item)
+        return super().to_representation(items)
 
-class CustomUserSerializer(UserSerializer):
-    is_subscribed = serializers.SerializerMethodField()
+
+class ProfileSerializer(TimedSerializerMixin, UserSerializer):
 
     class Meta:
         model = User
@@ -21,19 +48,28 @@ class CustomUserSerializer(UserSerializer):
             'id',
             'username',
             'first_name',
-            'last_name',
-            'is_subscribed'
+            'last_name'
         )
 
+
+class CustomUserSerializer(ProfileSerializer):
+    is_subscribed = serializers.SerializerMethodField()
+
+    class Meta(ProfileSerializer.Meta):
+        fields = ProfileSerializer.Meta.fields + ('is_subscribed',)
+        list_serializer_class = RelationListSerializer
+
+    @staticmethod
+    def register_relations(loader, obj):
+        loader.register('is_subscribed', obj.id)
+
     def get_is_subscribed(self, obj):
-        request = self.context['request']
-        user = request.user
-        return Subscribe.objects.filter(
-            user=user.id, subscribing=obj.id
-        ).exists()
+        return RelationLoader.from_context(self.context).get(
+            'is_subscribed', obj.id
+        )
 
 
-class CustomUserCreateSerializer(UserCreateSerializer):
+class CustomUserCreateSerializer(TimedSerializerMixin, UserCreateSerializer):
 
     class Meta:
         model = User
@@ -46,7 +82,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         )
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     name = serializers.CharField(read_only=True)
     color = serializers.CharField(read_only=True)
     slug = serializers.SlugField(read_only=True)
@@ -59,9 +95,10 @@ class TagSerializer(serializers.ModelSerializer):
             'color',
             'slug'
         )
+        list_serializer_class = TimedListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
@@ -107,24 +144,115 @@ class WriteIngredientRecipeSerializer(IngredientSerializer):
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'max_size': (
+            'Размер изображения не должен превышать {max_size} байт.'
+        ),
+        'max_side': (
+            'Стороны изображения не должны превышать {max_side} пикселей.'
+        ),
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            extstr, imgstr = data.split(';base64,')
-            ext = extstr.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode_base64(data)
+        elif hasattr(data, 'size'):
+            self.validate_file(data)
         return super().to_internal_value(data)
 
-
-class RecipeSerializer(serializers.ModelSerializer):
+    def validate_size(self, size):
+        if size > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+
+    def validate_dimensions(self, dimensions):
+        if max(dimensions) > settings.RECIPE_IMAGE_MAX_SIDE:
+            self.fail('max_side', max_side=settings.RECIPE_IMAGE_MAX_SIDE)
+
+    def validate_file(self, data):
+        self.validate_size(data.size)
+        try:
+            dimensions = Image.open(data).size
+        except Exception:
+            return
+        finally:
+            data.seek(0)
+        self.validate_dimensions(dimensions)
+
+    def decode_base64(self, data):
+        try:
+            extstr, imgstr = data.split(';base64,')
+        except ValueError:
+            self.fail('invalid_image')
+        imgstr = ''.join(imgstr.split())
+        self.validate_size(len(imgstr) * 3 // 4)
+        ext = extstr.split('/')[-1]
+        image = TemporaryUploadedFile(
+            'temp.' + ext, extstr[len('data:'):], 0, None
+        )
+        parser = ImageFile.Parser()
+        try:
+            for start in range(0, len(imgstr), BASE64_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    imgstr[start:start + BASE64_CHUNK_SIZE]
+                )
+                if parser.image is None:
+                    parser.feed(chunk)
+                    if parser.image is not None:
+                        self.validate_dimensions(parser.image.size)
+                image.write(chunk)
+        except (binascii.Error, OSError, SyntaxError):
+            image.close()
+            self.fail('invalid_image')
+        except serializers.ValidationError:
+            image.close()
+            raise
+        image.size = image.tell()
+        image.seek(0)
+        return image
+
+
+class RecipeFragmentSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     tags = TagSerializer(many=True, read_only=True)
-    author = CustomUserSerializer(read_only=True)
+    author = ProfileSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField()
     image = Base64ImageField(required=False, allow_null=True)
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
+        fields = (
+            'id',
+            'tags',
+            'author',
+            'ingredients',
+            'name',
+            'image',
+            'text',
+            'cooking_time'
+        )
+
+    def get_ingredients(self, obj):
+        return IngredientRecipeSerializer(
+            obj.ingredientrecipes.all(), many=True
+        ).data
+
+
+class RecipeListSerializer(RelationListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        recipes = list(iterable)
+        fragments = self.child.load_fragments(recipes)
+        for recipe in recipes:
+            recipe.fragment = fragments[recipe.pk]
+        return super().to_representation(recipes)
+
+
+class RecipeSerializer(RecipeFragmentSerializer):
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+
+    class Meta(RecipeFragmentSerializer.Meta):
         fields = (
             'id',
             'tags',
@@ -137,25 +265,54 @@ class RecipeSerializer(serializers.ModelSerializer):
             'text',
             'cooking_time'
         )
+        list_serializer_class = RecipeListSerializer
 
-    def get_ingredients(self, obj):
-        ingredients = IngredientRecipe.objects.filter(recipe=obj)
-        return IngredientRecipeSerializer(ingredients, many=True).data
+    @staticmethod
+    def load_fragments(recipes):
+        by_pk = {recipe.pk: recipe for recipe in recipes}
+
+        def build(pks):
+            misses = [by_pk[pk] for pk in pks]
+            prefetch_related_objects(
+                misses,
+                'author',
+                'tags',
+                Prefetch(
+                    'ingredientrecipes',
+                    queryset=IngredientRecipe.objects.select_related(
+                        'ingredient'
+                    )
+                ),
+            )
+            return {
+                recipe.pk: RecipeFragmentSerializer(recipe).data
+                for recipe in misses
+            }
+
+        return cached_fragments(
+            Recipe,
+            FRAGMENT_DEPENDENCIES,
+            {pk: recipe.updated_at for pk, recipe in by_pk.items()},
+            build
+        )
 
-    def get_is_favorited(self, obj):
-        request = self.context['request']
-        return Favorite.objects.filter(
-            user=request.user.id, recipe=obj.id
-        ).exists()
+    @staticmethod
+    def register_relations(loader, obj):
+        loader.register('is_favorited', obj.id)
+        loader.register('is_in_shopping_cart', obj.id)
+        loader.register('is_subscribed', obj.author_id)
 
-    def get_is_in_shopping_cart(self, obj):
-        request = self.context['request']
-        return ShoppingCart.objects.filter(
-            user=request.user.id, recipe=obj.id
-        ).exists()
+    def to_representation(self, instance):
+        if hasattr(instance, 'fragment'):
+            fragment = instance.fragment
+        else:
+            fragment = self.load_fragments([instance])[instance.pk]
+        loader = RelationLoader.from_context(self.context)
+        self.register_relations(loader, instance)
+        return overlay(fragment, loader, self.context.get('request'))
 
 
-class WriteRecipeSerializer(serializers.ModelSerializer):
+class WriteRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True
     )
@@ -180,12 +337,53 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def create_ingredients(ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientRecipe.objects.create(
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
                 ingredient=ingredient.get('id'),
                 amount=ingredient.get('amount'),
                 recipe=recipe
             )
+            for ingredient in ingredients
+        )
+
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        existing = {
+            row.ingredient_id: row
+            for row in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        deltas = defaultdict(int)
+        to_create = []
+        to_update = []
+        for ingredient in ingredients:
+            amount = ingredient.get('amount')
+            row = existing.pop(ingredient.get('id').id, None)
+            if row is None:
+                to_create.append(IngredientRecipe(
+                    ingredient=ingredient.get('id'),
+                    amount=amount,
+                    recipe=recipe
+                ))
+                deltas[ingredient.get('id').id] += amount
+            elif row.amount != amount:
+                deltas[row.ingredient_id] += amount - row.amount
+                row.amount = amount
+                to_update.append(row)
+        for row in existing.values():
+            deltas[row.ingredient_id] -= row.amount
+        if existing:
+            IngredientRecipe.objects.filter(
+                id__in=[row.id for row in existing.values()]
+            ).delete()
+        IngredientRecipe.objects.bulk_update(to_update, ('amount',))
+        IngredientRecipe.objects.bulk_create(to_create)
+        if deltas:
+            change_shopping_list(
+                ShoppingCart.objects.filter(
+                    recipe=recipe
+                ).values_list('user_id', flat=True),
+                deltas
+            )
 
     @staticmethod
     def unique_ingredient_tag(value, message):
@@ -196,6 +394,15 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
             unique_list.append(object)
         return value
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context['request'].user
         ingredients = validated_data.pop('ingredientrecipe_set')
@@ -206,12 +413,13 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
         )
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        fan_out(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredientrecipe_set')
         tags = validated_data.pop('tags')
-        IngredientRecipe.objects.filter(recipe=instance).delete()
         instance.image = validated_data.get('image', instance.image)
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
@@ -220,7 +428,7 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
         )
         instance.save()
         instance.tags.set(tags)
-        self.create_ingredients(ingredients, instance)
+        self.update_ingredients(ingredients, instance)
         return instance
 
     def to_representation(self, instance):
@@ -235,7 +443,7 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
         return self.unique_ingredient_tag(value, message_validator)
 
 
-class ShowRecipeSerializer(serializers.ModelSerializer):
+class ShowRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
@@ -247,74 +455,49 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-
-    validators = [UniqueTogetherValidator(
-        queryset=ShoppingCart.objects.all(),
-        fields=('recipe', 'user'),
-        message='Рецепт уже добавлен в покупки'
-    )]
-
-
-class FavoriteSerializer(serializers.ModelSerializer):
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_IDS_LIMIT
+    )
 
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
 
-    validators = [UniqueTogetherValidator(
-        queryset=Favorite.objects.all(),
-        fields=('recipe', 'user'),
-        message='Рецепт уже добавлен в избранное'
-    )]
+class ShowSubscribeListSerializer(RelationListSerializer):
+    def to_representation(self, data):
+        authors = list(data)
+        latest_recipes = defaultdict(list)
+        recipes = Recipe.objects.filter(author__in=authors).only(
+            *ShowRecipeSerializer.Meta.fields, 'author', 'pub_date'
+        ).latest_per_author(self.child.get_recipes_limit())
+        for recipe in recipes:
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = latest_recipes[author.id]
+        return super().to_representation(authors)
 
 
 class ShowSubscribeSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(CustomUserSerializer.Meta):
         fields = CustomUserSerializer.Meta.fields + (
             'recipes', 'recipes_count'
         )
+        list_serializer_class = ShowSubscribeListSerializer
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+    def get_recipes_limit(self):
+        return ShowRecipePagination().get_page_size(self.context['request'])
 
     def get_recipes(self, obj):
-        request = self.context['request']
-        recipes = Recipe.objects.filter(author=obj)
-        paginator = ShowRecipePagination()
-        recipes_limit = paginator.paginate_queryset(
-            recipes, request
-        )
+        if hasattr(obj, 'latest_recipes'):
+            recipes = obj.latest_recipes
+        else:
+            recipes = obj.recipes.all()[:self.get_recipes_limit()]
         serializer = ShowRecipeSerializer(
-            recipes_limit,
+            recipes,
             many=True,
-            context={'request': request}
+            context=self.context
         )
         return serializer.data
-
-
-class SubscribeSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = Subscribe
-        fields = ('user', 'subscribing')
-
-    validators = [UniqueTogetherValidator(
-        queryset=Subscribe.objects.all(),
-        fields=('subscribing', 'user'),
-        message='Подписка уже оформлена'
-    )]
-
-    def validate(self, data):
-        if data['user'] == data['subscribing']:
-            raise serializers.ValidationError(
-                'На себя подписаться нельзя'
-            )
-        return data
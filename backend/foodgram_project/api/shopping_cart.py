@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def title(user):
+    return f'Список покупок для {user}:'
+
+
+def write_txt(user, items):
+    yield f'{title(user)}\n\n'
+    for name, measurement_unit, amount in items:
+        yield f'{name} ({measurement_unit}) - {amount}\n'
+
+
+def write_csv(user, items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in items:
+        yield writer.writerow(row)
+
+
+def write_json(user, items):
+    yield '['
+    separator = ''
+    for name, measurement_unit, amount in items:
+        yield separator + json.dumps({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']'
+
+
+def write_pdf(user, items):
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_CART_PDF_FONT)
+        )
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    height = A4[1]
+    y = height - PDF_MARGIN
+    pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE + 4)
+    pdf.drawString(PDF_MARGIN, y, title(user))
+    y -= 2 * PDF_FONT_SIZE
+    pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+    for name, measurement_unit, amount in items:
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(
+            PDF_MARGIN, y, f'{name} ({measurement_unit}) - {amount}'
+        )
+        y -= PDF_FONT_SIZE * 1.5
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
+
+
+SHOPPING_CART_FORMATS = {
+    'txt': (write_txt, 'text/plain; charset=utf-8'),
+    'csv': (write_csv, 'text/csv; charset=utf-8'),
+    'json': (write_json, 'application/json'),
+    'pdf': (write_pdf, 'application/pdf'),
+}
@@ -0,0 +1,60 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.autocomplete import ingredient_index
+from api.cache import bump_version, get_version
+from api.metrics import track_query
+from api.serializers import ProfileSerializer
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_index(sender, instance, **kwargs):
+    previous = get_version(sender)
+    ingredient_index.update(instance, previous, bump_version(sender))
+
+
+@receiver(post_delete, sender=Ingredient)
+def remove_from_ingredient_index(sender, instance, **kwargs):
+    previous = get_version(sender)
+    ingredient_index.remove(instance.pk, previous, bump_version(sender))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_reference_version(sender, **kwargs):
+    bump_version(sender)
+
+
+@receiver(post_save, sender=User)
+def refresh_author_fragments(sender, instance, created, update_fields,
+                             **kwargs):
+    if created or (
+        update_fields is not None
+        and set(ProfileSerializer.Meta.fields).isdisjoint(update_fields)
+    ):
+        return
+    Recipe.objects.filter(author=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def refresh_tagged_fragments(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        recipes = Recipe.objects.filter(pk=instance.pk)
+    elif reverse and action in ('post_add', 'post_remove'):
+        recipes = Recipe.objects.filter(pk__in=pk_set)
+    elif reverse and action == 'pre_clear':
+        recipes = instance.recipes.all()
+    else:
+        return
+    recipes.update(updated_at=timezone.now())
+
+
+@receiver(connection_created)
+def install_query_tracker(sender, connection, **kwargs):
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, track_query)
@@ -0,0 +1,207 @@
+import base64
+import io
+import json
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api.autocomplete import ingredient_index
+from api.cache import bump_version, get_version
+from api.serializers import BASE64_CHUNK_SIZE, Base64ImageField
+from recipes.benchmark import seed
+from recipes.management.commands.check_recipe_contract import (ORDERS, Command,
+                                                               fetch)
+from recipes.models import Ingredient, Recipe, ShoppingListItem, Tag
+from users.models import User
+
+CONTRACT_DATASET = {
+    'users': 12,
+    'recipes': 60,
+    'ingredients': 30,
+    'tags': 4,
+    'ingredients_per_recipe': 5,
+    'favorites_per_user': 6,
+    'carts_per_user': 3,
+    'subscriptions_per_user': 4,
+}
+
+
+class RecipeReadContractTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(CONTRACT_DATASET)
+        viewer = User.objects.order_by('-id').first()
+        cls.token = Token.objects.create(user=viewer).key
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fast_path_matches_serializer(self):
+        clients = {
+            'anonymous': Client(),
+            'user': Client(HTTP_AUTHORIZATION=f'Token {self.token}'),
+        }
+        for path, private in Command.paths():
+            for viewer, client in clients.items():
+                if private and viewer == 'anonymous':
+                    continue
+                responses = []
+                for _, fast, clear in ORDERS:
+                    if clear:
+                        cache.clear()
+                    responses.append(fetch(client, path, fast))
+                with self.subTest(viewer=viewer, path=path):
+                    for content in responses[1:]:
+                        self.assertEqual(content, responses[0])
+
+    def test_fast_path_reports_serializer_time(self):
+        client = Client(HTTP_AUTHORIZATION=f'Token {self.token}')
+        recipe = Recipe.objects.order_by('id').first()
+        for path in ('/api/recipes/', f'/api/recipes/{recipe.id}/',
+                     '/api/feed/'):
+            timings = dict(
+                metric.split(';dur=')
+                for metric in client.get(path)['Server-Timing'].split(', ')
+            )
+            with self.subTest(path=path):
+                self.assertGreater(float(timings['serializer']), 0)
+
+
+class BulkRemoveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(CONTRACT_DATASET)
+        cls.user = User.objects.create_user(
+            username='bulk', email='bulk@example.com', password='!'
+        )
+        cls.token = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def request(self, method, path, ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.generic(
+                method, path, json.dumps({'ids': ids}),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_remove_cost_does_not_grow_with_ids(self):
+        ids = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+        for path, counter in (
+            ('/api/recipes/favorite/', 'favorites_count'),
+            ('/api/recipes/shopping_cart/', 'in_carts_count'),
+        ):
+            before = dict(Recipe.objects.values_list('id', counter))
+            costs = []
+            for size in (3, 30):
+                self.request('POST', path, ids[:size])
+                costs.append(self.request('DELETE', path, ids[:size]))
+            with self.subTest(path=path):
+                self.assertEqual(costs[0], costs[1])
+                self.assertEqual(
+                    dict(Recipe.objects.values_list('id', counter)), before
+                )
+        self.assertFalse(ShoppingListItem.objects.filter(
+            user=self.user, total_amount__gt=0
+        ).exists())
+
+
+class KeysetPaginationTest(TestCase):
+    path = '/api/recipes/?pagination=cursor&limit=7'
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(CONTRACT_DATASET)
+
+    def fetch(self, url):
+        response = self.client.get(url, HTTP_HOST='testserver')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_next_and_previous(self):
+        ordered = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+        first = self.fetch(self.path)
+        second = self.fetch(first['next'])
+        self.assertEqual(
+            [recipe['id'] for recipe in first['results']], ordered[:7]
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in second['results']], ordered[7:14]
+        )
+        previous = self.fetch(second['previous'])
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_invalid_cursor(self):
+        for position in (
+            'garbage', '[1]', '["garbage", "x"]', '["2023-01-01", "x"]',
+            '[null, 1]', '[{}, []]',
+        ):
+            cursor = base64.b64encode(
+                urlencode({'p': position}).encode()
+            ).decode()
+            with self.subTest(position=position):
+                response = self.client.get(f'{self.path}&cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+
+class IngredientIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        ingredient_index.build(get_version(Ingredient))
+
+    def test_changes_apply_without_rebuild(self):
+        ingredient = Ingredient.objects.create(
+            name='сахар', measurement_unit='г'
+        )
+        with self.assertNumQueries(0):
+            found = ingredient_index.search('сах')
+        self.assertEqual([item['id'] for item in found], [ingredient.pk])
+        ingredient.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(ingredient_index.search('сах'), [])
+
+    def test_foreign_change_triggers_rebuild(self):
+        bump_version(Ingredient)
+        Ingredient.objects.create(name='сахар', measurement_unit='г')
+        with self.assertNumQueries(1):
+            ingredient_index.search('сах')
+
+
+class VersionedCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_change_within_a_second_moves_last_modified(self):
+        first = self.client.get('/api/tags/')
+        Tag.objects.create(name='Ужин', color='#000000', slug='dinner')
+        second = self.client.get(
+            '/api/tags/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+        )
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json()), 1)
+        self.assertNotEqual(second['Last-Modified'], first['Last-Modified'])
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    def test_line_wrapped_base64_larger_than_chunk(self):
+        image = Image.effect_noise((256, 256), 64).convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        raw = buffer.getvalue()
+        encoded = base64.encodebytes(raw).decode()
+        self.assertGreater(len(encoded), BASE64_CHUNK_SIZE)
+        decoded = Base64ImageField().decode_base64(
+            'data:image/png;base64,' + encoded
+        )
+        self.assertEqual(decoded.read(), raw)
@@ -1,16 +1,24 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                       TagViewSet)
+from api.async_views import async_read_urls
+from api.views import (CustomUserViewSet, FeedViewSet, IngredientViewSet,
+                       RecipeViewSet, TagViewSet, metrics)
 
 router = DefaultRouter()
 router.register('users', CustomUserViewSet, basename='users')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
+router.register('feed', FeedViewSet, basename='feed')
+
+router_urls = router.urls
+if settings.ASYNC_READ_PATH:
+    async_read_urls(router_urls)
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
-    path('', include(router.urls)),
+    path('metrics/', metrics, name='metrics'),
+    path('', include(router_urls)),
 ]
@@ -1,39 +1,106 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import filters, status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from api.autocomplete import ingredient_index
+from api.cache import VersionedCacheMixin
 from api.filters import RecipeFilter
-from api.paginations import CustomPagination
+from api.loaders import RelationLoader
+from api.metrics import registry
+from api.paginations import CustomPagination, FeedPagination, KeysetPagination
 from api.permissions import (IsAuthenticatedFilterFavoritedAndShoppingCart,
                              IsAuthorAdminOrReadOnly)
-from api.serializers import (CustomUserSerializer, FavoriteSerializer,
-                             IngredientSerializer, RecipeSerializer,
-                             ShoppingCartSerializer, ShowRecipeSerializer,
-                             ShowSubscribeSerializer, SubscribeSerializer,
+from api.readers import RecipeReader, recipe_rows
+from api.serializers import (CustomUserSerializer, IngredientSerializer,
+                             RecipeIdsSerializer, RecipeSerializer,
+                             ShowRecipeSerializer, ShowSubscribeSerializer,
                              TagSerializer, WriteRecipeSerializer)
-from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Subscribe, Tag, User)
+from api.shopping_cart import SHOPPING_CART_FORMATS
+from recipes.counters import change_counters_for
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Subscribe, Tag,
+                            User)
+from recipes.shopping_list import change_shopping_list, recipe_amounts
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+def lock_user(user):
+    list(User.objects.select_for_update().filter(pk=user.pk).values('pk'))
+
+
+def delete_rows(model, pks):
+    if not pks:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.pk.column)} IN ({placeholders})',
+            list(pks)
+        )
+
+
+def create_relation(model, message, **fields):
+    try:
+        with transaction.atomic():
+            lock_user(fields['user'])
+            return model.objects.create(**fields)
+    except IntegrityError:
+        raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+
+@transaction.atomic
+def delete_relation(model, **fields):
+    lock_user(fields['user'])
+    deleted, _ = model.objects.filter(**fields).delete()
+    if not deleted:
+        raise NotFound()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TagViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('^name',)
+    authentication_classes = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            self.autocomplete, request, *args, **kwargs
+        )
+
+    def autocomplete(self, request, *args, **kwargs):
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                raise ValidationError(
+                    {'limit': 'Значение должно быть положительным числом'}
+                )
+        return Response(ingredient_index.search(
+            request.query_params.get(api_settings.SEARCH_PARAM, ''),
+            limit
+        ))
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -47,29 +114,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' and not params.get(
+                'search'
+            ):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_serializer_class(self):
         if self.action == "list" or self.action == "retrieve":
             return RecipeSerializer
         return WriteRecipeSerializer
 
-    @staticmethod
-    def create_object_in_action(serializer, pk):
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        show_serializer = ShowRecipeSerializer(
-            Recipe.objects.get(id=pk)
-        )
-        return Response(
-            show_serializer.data,
-            status=status.HTTP_201_CREATED
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_READ:
+            return super().list(request, *args, **kwargs)
+        reader = RecipeReader(self.get_serializer_context())
+        rows = recipe_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(reader.represent(rows))
+        return self.get_paginated_response(reader.represent(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_READ:
+            return super().retrieve(request, *args, **kwargs)
+        row = get_object_or_404(
+            recipe_rows(self.filter_queryset(self.get_queryset())),
+            pk=kwargs['pk']
         )
+        self.check_object_permissions(request, row)
+        reader = RecipeReader(self.get_serializer_context())
+        return Response(reader.represent([row])[0])
 
-    @staticmethod
-    def delete_object_in_action(model, user, recipe):
-        get_object_or_404(
-            model, user=user, recipe=recipe
-        ).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(
+            request,
+            force=force or self.action == 'download_shopping_cart'
+        )
 
     @action(
         detail=False,
@@ -77,34 +164,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def download_shopping_cart(self, request):
         user = request.user
-        ingredient = IngredientRecipe.objects.filter(
-            recipe__shoppingcarts__user=user).values(
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in SHOPPING_CART_FORMATS:
+            raise ValidationError({'format': (
+                'Допустимые форматы: '
+                + ', '.join(SHOPPING_CART_FORMATS)
+            )})
+        writer, content_type = SHOPPING_CART_FORMATS[file_format]
+        ingredients = ShoppingListItem.objects.filter(
+            user=user
+        ).order_by('ingredient__name').values_list(
             'ingredient__name',
-            'ingredient__measurement_unit'
-        ).order_by('ingredient__name').annotate(
-            summ_amount=Sum('amount')
-        )
-        name = ingredient.values_list(
-            'ingredient__name',
-            flat=True
-        )
-        measurement_unit = ingredient.values_list(
             'ingredient__measurement_unit',
-            flat=True
+            'total_amount'
         )
-        amount = ingredient.values_list(
-            'summ_amount',
-            flat=True
+        response = StreamingHttpResponse(
+            writer(user, ingredients.iterator()),
+            content_type=content_type
         )
-        shopping_cart = [f'Список покупок для {user}:\n\n']
-        for i in range(len(name)):
-            shopping_cart.append(
-                f'{name[i]} ({measurement_unit[i]}) - {amount[i]}\n'
-            )
-        response = HttpResponse(shopping_cart)
-        response['Content-Type'] = 'text/plain'
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.txt"'
+            f'attachment; filename="shopping_cart.{file_format}"'
         )
         return response
 
@@ -114,16 +193,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def shopping_cart(self, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        data = {
-            'recipe': recipe.id,
-            'user': user.id
-        }
         if request.method == 'POST':
-            serializer = ShoppingCartSerializer(data=data)
-            return self.create_object_in_action(serializer, pk)
-        return self.delete_object_in_action(ShoppingCart, user, recipe)
+            return self.add_recipe_relation(
+                ShoppingCart, request.user, pk, 'Рецепт уже добавлен в покупки'
+            )
+        return delete_relation(ShoppingCart, user=request.user, recipe=pk)
 
     @action(
         methods=('post', 'delete'),
@@ -131,16 +205,124 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def favorite(self, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        data = {
-            'recipe': recipe.id,
-            'user': user.id
+        if request.method == 'POST':
+            return self.add_recipe_relation(
+                Favorite, request.user, pk, 'Рецепт уже добавлен в избранное'
+            )
+        return delete_relation(Favorite, user=request.user, recipe=pk)
+
+    @staticmethod
+    def add_recipe_relation(model, user, pk, message):
+        recipe = get_object_or_404(
+            Recipe.objects.only(*ShowRecipeSerializer.Meta.fields), id=pk
+        )
+        create_relation(model, message, user=user, recipe=recipe)
+        return Response(
+            ShowRecipeSerializer(recipe).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_add(model, user, ids):
+        lock_user(user)
+        found = set(
+            Recipe.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        present = set(model.objects.filter(
+            user=user, recipe_id__in=found
+        ).values_list('recipe_id', flat=True))
+        added = [pk for pk in ids if pk in found and pk not in present]
+        model.objects.bulk_create(
+            [model(user=user, recipe_id=pk) for pk in added]
+        )
+        change_counters_for(model, 'recipe', added, 1)
+        if model is ShoppingCart:
+            change_shopping_list([user.id], recipe_amounts(added))
+        return {
+            pk: 'added' if pk in added else (
+                'exists' if pk in present else 'not_found'
+            )
+            for pk in ids
+        }
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_remove(model, user, ids):
+        lock_user(user)
+        locked = dict(model.objects.filter(
+            user=user, recipe_id__in=ids
+        ).select_for_update().values_list('pk', 'recipe_id'))
+        delete_rows(model, list(locked))
+        removed = set(locked.values())
+        change_counters_for(model, 'recipe', removed, -1)
+        if model is ShoppingCart:
+            change_shopping_list([user.id], recipe_amounts(removed, -1))
+        return {
+            pk: 'removed' if pk in removed else 'not_found' for pk in ids
         }
+
+    def bulk_action(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
         if request.method == 'POST':
-            serializer = FavoriteSerializer(data=data)
-            return self.create_object_in_action(serializer, pk)
-        return self.delete_object_in_action(Favorite, user, recipe)
+            results = self.bulk_add(model, request.user, ids)
+        else:
+            results = self.bulk_remove(model, request.user, ids)
+        return Response({'results': [
+            {'id': pk, 'status': results[pk]} for pk in ids
+        ]})
+
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='shopping_cart',
+        permission_classes=(IsAuthenticated,)
+    )
+    def bulk_shopping_cart(self, request):
+        return self.bulk_action(request, ShoppingCart)
+
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='favorite',
+        permission_classes=(IsAuthenticated,)
+    )
+    def bulk_favorite(self, request):
+        return self.bulk_action(request, Favorite)
+
+
+class FeedViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    serializer_class = RecipeSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = FeedPagination
+
+    def get_queryset(self):
+        return FeedEntry.objects.filter(
+            user=self.request.user
+        ).select_related('recipe')
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_READ:
+            page = self.paginate_queryset(self.get_queryset())
+            serializer = self.get_serializer(
+                [entry.recipe for entry in page],
+                many=True
+            )
+            return self.get_paginated_response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset().values(
+            'pub_date', 'recipe_id', 'author_id', 'recipe__updated_at'
+        ))
+        reader = RecipeReader(self.get_serializer_context())
+        return self.get_paginated_response(reader.represent(
+            {
+                'id': entry['recipe_id'],
+                'author_id': entry['author_id'],
+                'updated_at': entry['recipe__updated_at'],
+            }
+            for entry in page
+        ))
 
 
 class CustomUserViewSet(UserViewSet):
@@ -158,7 +340,9 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        subscribing = User.objects.filter(subscribing__user=user)
+        subscribing = User.objects.filter(
+            subscribing__user=user
+        ).order_by('id')
         page = self.paginate_queryset(subscribing)
         serializer = ShowSubscribeSerializer(
             page,
@@ -174,26 +358,31 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscribe(self, request, id):
         user = request.user
+        if request.method == 'DELETE':
+            return delete_relation(Subscribe, user=user, subscribing=id)
         subscribing = get_object_or_404(User, id=id)
-        data = {
-            'subscribing': subscribing.id,
-            'user': user.id
-        }
-        if request.method == 'POST':
-            serializer = SubscribeSerializer(data=data)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            show_serializer = ShowSubscribeSerializer(
-                User.objects.get(id=id),
-                context={'request': request}
-            )
-            return Response(
-                show_serializer.data,
-                status=status.HTTP_201_CREATED
-            )
-        get_object_or_404(
-            Subscribe,
-            user=user,
-            subscribing=subscribing
-        ).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        if subscribing == user:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'На себя подписаться нельзя'
+                ]
+            })
+        create_relation(
+            Subscribe, 'Подписка уже оформлена',
+            user=user, subscribing=subscribing
+        )
+        context = self.get_serializer_context()
+        RelationLoader.from_context(context).set(
+            'is_subscribed', subscribing.id, True
+        )
+        return Response(
+            ShowSubscribeSerializer(subscribing, context=context).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+def metrics(request):
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
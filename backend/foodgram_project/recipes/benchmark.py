@@ -0,0 +1,190 @@
+import math
+import random
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from recipes.counters import recount_counters
+from recipes.feed import backfill_feed
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Subscribe, Tag)
+from recipes.shopping_list import repair_shopping_lists
+from users.models import User
+
+BATCH_SIZE = 1000
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-api',
+    }
+}
+RECIPE_WORDS = (
+    'Борщ', 'Суп', 'Каша', 'Плов', 'Салат', 'Пирог', 'Омлет', 'Рагу'
+)
+DEFAULT_SEED_OPTIONS = {
+    'users': 200,
+    'recipes': 1000,
+    'ingredients': 500,
+    'tags': 8,
+    'ingredients_per_recipe': 8,
+    'favorites_per_user': 20,
+    'carts_per_user': 5,
+    'subscriptions_per_user': 10,
+    'zipf': 1.1,
+    'seed': 42,
+}
+
+
+def zipf_weights(size, exponent):
+    return [1 / rank ** exponent for rank in range(1, size + 1)]
+
+
+def zipf_sample(rng, population, weights, size):
+    size = min(size, len(population))
+    chosen = set()
+    while len(chosen) < size:
+        chosen.update(rng.choices(population, weights, k=size - len(chosen)))
+    return chosen
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+@contextmanager
+def benchmark_database():
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        with override_settings(
+            CACHES=BENCH_CACHES, MEDIA_ROOT=tempfile.mkdtemp()
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def ids(model):
+    return list(model.objects.order_by('id').values_list('id', flat=True))
+
+
+@transaction.atomic
+def seed(options):
+    options = {**DEFAULT_SEED_OPTIONS, **options}
+    rng = random.Random(options['seed'])
+    exponent = options['zipf']
+    User.objects.bulk_create(
+        (
+            User(
+                username=f'bench{index}',
+                email=f'bench{index}@example.com',
+                first_name=f'Имя{index}',
+                last_name=f'Фамилия{index}',
+                password='!'
+            )
+            for index in range(options['users'])
+        ),
+        batch_size=BATCH_SIZE
+    )
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {index}', color=f'#{index:06X}', slug=f'tag{index}')
+        for index in range(options['tags'])
+    )
+    Ingredient.objects.bulk_create(
+        (
+            Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(options['ingredients'])
+        ),
+        batch_size=BATCH_SIZE
+    )
+    user_ids = ids(User)
+    tag_ids = ids(Tag)
+    ingredient_ids = ids(Ingredient)
+    author_weights = zipf_weights(len(user_ids), exponent)
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                author_id=author_id,
+                name=f'{rng.choice(RECIPE_WORDS)} {index}',
+                text=' '.join(rng.choices(RECIPE_WORDS, k=12)).lower(),
+                image='recipes/bench.png',
+                cooking_time=rng.randint(1, 180)
+            )
+            for index, author_id in enumerate(rng.choices(
+                user_ids, author_weights, k=options['recipes']
+            ))
+        ),
+        batch_size=BATCH_SIZE
+    )
+    recipe_ids = ids(Recipe)
+    Recipe.tags.through.objects.bulk_create(
+        (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(tag_ids, rng.randint(1, 3))
+        ),
+        batch_size=BATCH_SIZE
+    )
+    ingredient_weights = zipf_weights(len(ingredient_ids), exponent)
+    IngredientRecipe.objects.bulk_create(
+        (
+            IngredientRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in zipf_sample(
+                rng, ingredient_ids, ingredient_weights,
+                options['ingredients_per_recipe']
+            )
+        ),
+        batch_size=BATCH_SIZE
+    )
+    popular_recipes = rng.sample(recipe_ids, len(recipe_ids))
+    recipe_weights = zipf_weights(len(popular_recipes), exponent)
+    for model, per_user in (
+        (Favorite, options['favorites_per_user']),
+        (ShoppingCart, options['carts_per_user']),
+    ):
+        model.objects.bulk_create(
+            (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in zipf_sample(
+                    rng, popular_recipes, recipe_weights, per_user
+                )
+            ),
+            batch_size=BATCH_SIZE
+        )
+    subscriptions = [
+        (user_id, author_id)
+        for user_id in user_ids
+        for author_id in zipf_sample(
+            rng, user_ids, author_weights, options['subscriptions_per_user']
+        )
+        if author_id != user_id
+    ]
+    Subscribe.objects.bulk_create(
+        (
+            Subscribe(user_id=user_id, subscribing_id=author_id)
+            for user_id, author_id in subscriptions
+        ),
+        batch_size=BATCH_SIZE
+    )
+    recount_counters()
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        repair_shopping_lists(user_ids[start:start + BATCH_SIZE])
+    for user_id, author_id in subscriptions:
+        backfill_feed(user_id, author_id)
+    return options
@@ -0,0 +1,34 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart, Subscribe
+from users.models import User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribe, 'subscribing'),
+)
+
+
+def change_counter(model, pks, field, delta):
+    return model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def recount_counters():
+    for model, field, related_model, related_field in COUNTERS:
+        count = related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            count=Count('pk')
+        ).values('count')
+        model.objects.update(**{field: Coalesce(Subquery(count), 0)})
+
+
+def change_counters_for(related_model, related_field, pks, delta):
+    for model, field, counted_model, counted_field in COUNTERS:
+        if counted_model is related_model and counted_field == related_field:
+            change_counter(model, pks, field, delta)
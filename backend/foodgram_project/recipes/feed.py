@@ -0,0 +1,45 @@
+from recipes.models import FeedEntry, Recipe, Subscribe
+
+BATCH_SIZE = 1000
+
+
+def fan_out(recipe):
+    subscribers = Subscribe.objects.filter(
+        subscribing_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                author_id=recipe.author_id,
+                recipe_id=recipe.id,
+                pub_date=recipe.pub_date
+            )
+            for user_id in subscribers.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill_feed(user_id, author_id):
+    recipes = Recipe.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date').order_by()
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                author_id=author_id,
+                recipe_id=recipe_id,
+                pub_date=pub_date
+            )
+            for recipe_id, pub_date in recipes.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def prune_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
@@ -0,0 +1,385 @@
+import base64
+import io
+import json
+import statistics
+import time
+from collections import defaultdict, namedtuple
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.benchmark import (DEFAULT_SEED_OPTIONS, benchmark_database,
+                               percentile, seed)
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+Scenario = namedtuple('Scenario', 'name method path data store headers')
+BENCH_PASSWORDS = ('Bench-pass-1357', 'Bench-pass-2468')
+BULK_SIZE = 10
+
+
+def png_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+def scenario(name, path, method='get', data=None, store=None, headers=None):
+    return Scenario(name, method, path, data, store, headers)
+
+
+def resolve(value, state):
+    return value(state) if callable(value) else value
+
+
+def signup_data(state):
+    state['signups'] = state.get('signups', 0) + 1
+    return {
+        'email': f'bench-signup-{state["signups"]}@example.com',
+        'username': f'bench_signup_{state["signups"]}',
+        'first_name': 'Бенч',
+        'last_name': 'Регистрация',
+        'password': BENCH_PASSWORDS[0],
+    }
+
+
+def password_data(state):
+    current = state.get('password', BENCH_PASSWORDS[0])
+    state['password'] = BENCH_PASSWORDS[current == BENCH_PASSWORDS[0]]
+    return {'current_password': current, 'new_password': state['password']}
+
+
+def token_headers(state):
+    return {'HTTP_AUTHORIZATION': f'Token {state["login"]["auth_token"]}'}
+
+
+class Command(BaseCommand):
+    help = 'seed a synthetic dataset and benchmark the api endpoints'
+
+    def add_arguments(self, parser):
+        for option, default in DEFAULT_SEED_OPTIONS.items():
+            parser.add_argument(
+                '--' + option.replace('_', '-'),
+                default=default,
+                type=type(default),
+                help=f'dataset option, default {default}'
+            )
+        parser.add_argument(
+            '--iterations',
+            default=30,
+            type=int,
+            help='measured requests per endpoint'
+        )
+        parser.add_argument(
+            '--warmup',
+            default=3,
+            type=int,
+            help='unmeasured requests per endpoint before measuring'
+        )
+        parser.add_argument(
+            '--output',
+            help='write the JSON report to this file instead of stdout'
+        )
+        parser.add_argument(
+            '--compare',
+            nargs=2,
+            metavar=('BASELINE', 'CURRENT'),
+            help='compare two JSON reports and fail on regressions'
+        )
+        parser.add_argument(
+            '--threshold',
+            default=0.2,
+            type=float,
+            help='allowed relative growth of p95 latency and response size'
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self.compare(*options['compare'], options['threshold'])
+            return
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('--iterations должен быть больше 0')
+        report = self.run(options)
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f'Report saved to {options["output"]}'
+            ))
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        with benchmark_database():
+            return self.measure(options)
+
+    def measure(self, options):
+        started = time.monotonic()
+        dataset = seed({
+            option: options[option] for option in DEFAULT_SEED_OPTIONS
+        })
+        self.stderr.write(
+            f'Seeded in {time.monotonic() - started:.1f}s: '
+            f'{Recipe.objects.count()} recipes, {User.objects.count()} users'
+        )
+        viewer = User.objects.order_by('-id').first()
+        member = User.objects.create_user(
+            username='bench_login',
+            email='bench-login@example.com',
+            password=BENCH_PASSWORDS[0],
+        )
+        client = Client(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=viewer)}'
+        )
+        samples = defaultdict(lambda: defaultdict(list))
+        state = {}
+        scenarios = self.scenarios(viewer, member)
+        for iteration in range(options['warmup'] + options['iterations']):
+            for item in scenarios:
+                result = self.request(client, item, state)
+                if iteration >= options['warmup']:
+                    for key, value in result.items():
+                        samples[item.name][key].append(value)
+        return {
+            'meta': {
+                'dataset': dataset,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'database': connection.vendor,
+                'django': django.get_version(),
+            },
+            'results': {
+                name: self.summarize(values)
+                for name, values in samples.items()
+            },
+        }
+
+    def scenarios(self, viewer, member):
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        free_recipe, *bulk_recipes = Recipe.objects.exclude(
+            favorites__user=viewer
+        ).exclude(shoppingcarts__user=viewer).order_by('id').values_list(
+            'id', flat=True
+        )[:BULK_SIZE + 1]
+        bulk_data = {'ids': bulk_recipes}
+        author = User.objects.exclude(
+            subscribing__user=viewer
+        ).exclude(id=viewer.id).order_by('-subscribers_count').first()
+        tags = list(Tag.objects.values_list('id', 'slug')[:3])
+        tag_query = '&'.join(f'tags={slug}' for _, slug in tags)
+        ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:3]
+        )
+        recipe_data = {
+            'ingredients': [
+                {'id': pk, 'amount': 10} for pk in ingredients
+            ],
+            'tags': [pk for pk, _ in tags[:2]],
+            'image': png_data(),
+            'name': 'Суп бенчмарка',
+            'text': 'Проверка скорости создания рецепта',
+            'cooking_time': 10,
+        }
+        return [
+            scenario('tags.list', '/api/tags/'),
+            scenario('tags.retrieve', f'/api/tags/{tags[0][0]}/'),
+            scenario('ingredients.list', '/api/ingredients/'),
+            scenario(
+                'ingredients.retrieve', f'/api/ingredients/{ingredients[0]}/'
+            ),
+            scenario('ingredients.list[name]', '/api/ingredients/?name=инг'),
+            scenario('recipes.list', '/api/recipes/'),
+            scenario('recipes.list[tags]', f'/api/recipes/?{tag_query}'),
+            scenario(
+                'recipes.list[is_favorited]', '/api/recipes/?is_favorited=1'
+            ),
+            scenario(
+                'recipes.list[is_in_shopping_cart]',
+                '/api/recipes/?is_in_shopping_cart=1'
+            ),
+            scenario(
+                'recipes.list[cursor]', '/api/recipes/?pagination=cursor'
+            ),
+            scenario('recipes.list[search]', '/api/recipes/?search=суп'),
+            scenario('recipes.retrieve', f'/api/recipes/{recipe.id}/'),
+            scenario(
+                'recipes.download_shopping_cart',
+                '/api/recipes/download_shopping_cart/'
+            ),
+            scenario(
+                'recipes.favorite',
+                f'/api/recipes/{free_recipe}/favorite/', 'post'
+            ),
+            scenario(
+                'recipes.favorite[delete]',
+                f'/api/recipes/{free_recipe}/favorite/', 'delete'
+            ),
+            scenario(
+                'recipes.shopping_cart',
+                f'/api/recipes/{free_recipe}/shopping_cart/', 'post'
+            ),
+            scenario(
+                'recipes.shopping_cart[delete]',
+                f'/api/recipes/{free_recipe}/shopping_cart/', 'delete'
+            ),
+            scenario(
+                'recipes.bulk_favorite', '/api/recipes/favorite/', 'post',
+                bulk_data
+            ),
+            scenario(
+                'recipes.bulk_favorite[delete]', '/api/recipes/favorite/',
+                'delete', bulk_data
+            ),
+            scenario(
+                'recipes.bulk_shopping_cart', '/api/recipes/shopping_cart/',
+                'post', bulk_data
+            ),
+            scenario(
+                'recipes.bulk_shopping_cart[delete]',
+                '/api/recipes/shopping_cart/', 'delete', bulk_data
+            ),
+            scenario(
+                'recipes.create', '/api/recipes/', 'post', recipe_data,
+                store='recipe'
+            ),
+            scenario(
+                'recipes.update',
+                lambda state: f'/api/recipes/{state["recipe"]["id"]}/',
+                'put', recipe_data
+            ),
+            scenario(
+                'recipes.partial_update',
+                lambda state: f'/api/recipes/{state["recipe"]["id"]}/',
+                'patch', recipe_data
+            ),
+            scenario(
+                'recipes.destroy',
+                lambda state: f'/api/recipes/{state["recipe"]["id"]}/',
+                'delete'
+            ),
+            scenario('users.list', '/api/users/'),
+            scenario('users.create', '/api/users/', 'post', signup_data),
+            scenario('users.retrieve', f'/api/users/{author.id}/'),
+            scenario('users.me', '/api/users/me/'),
+            scenario('users.subscriptions', '/api/users/subscriptions/'),
+            scenario(
+                'users.subscribe', f'/api/users/{author.id}/subscribe/',
+                'post'
+            ),
+            scenario(
+                'users.subscribe[delete]',
+                f'/api/users/{author.id}/subscribe/', 'delete'
+            ),
+            scenario('feed.list', '/api/feed/'),
+            scenario(
+                'auth.token.login', '/api/auth/token/login/', 'post',
+                lambda state: {
+                    'email': member.email,
+                    'password': state.get('password', BENCH_PASSWORDS[0]),
+                },
+                store='login'
+            ),
+            scenario(
+                'users.set_password', '/api/users/set_password/', 'post',
+                password_data, headers=token_headers
+            ),
+            scenario(
+                'auth.token.logout', '/api/auth/token/logout/', 'post',
+                headers=token_headers
+            ),
+            scenario('metrics', '/api/metrics/'),
+        ]
+
+    @staticmethod
+    def request(client, item, state):
+        path = resolve(item.path, state)
+        data = resolve(item.data, state)
+        extra = resolve(item.headers, state) or {}
+        if data is not None:
+            extra.update({
+                'data': json.dumps(data),
+                'content_type': 'application/json',
+            })
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.generic(item.method.upper(), path, **extra)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{item.name}: {item.method.upper()} {path} '
+                f'ответил {response.status_code}'
+            )
+        if item.store:
+            state[item.store] = response.json()
+        return {
+            'latency': elapsed,
+            'queries': len(queries),
+            'size': size,
+            'status': response.status_code,
+        }
+
+    @staticmethod
+    def summarize(values):
+        latency = values['latency']
+        return {
+            'requests': len(latency),
+            'status': sorted(set(values['status'])),
+            'p50_ms': round(percentile(latency, 0.5), 3),
+            'p95_ms': round(percentile(latency, 0.95), 3),
+            'p99_ms': round(percentile(latency, 0.99), 3),
+            'mean_ms': round(statistics.mean(latency), 3),
+            'queries': max(values['queries']),
+            'size': int(statistics.median(values['size'])),
+        }
+
+    def compare(self, baseline_path, current_path, threshold):
+        try:
+            with open(baseline_path, encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+            with open(current_path, encoding='utf-8') as file:
+                current = json.load(file)['results']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать отчёт: {error}')
+        regressions = 0
+        for name in sorted(set(baseline) | set(current)):
+            if name not in baseline or name not in current:
+                self.stdout.write(f'{name}: only in one report, skipped')
+                continue
+            old, new = baseline[name], current[name]
+            problems = []
+            if new['p95_ms'] > old['p95_ms'] * (1 + threshold):
+                problems.append(
+                    f'p95 {old["p95_ms"]:.2f} -> {new["p95_ms"]:.2f} ms'
+                )
+            if new['queries'] > old['queries']:
+                problems.append(
+                    f'queries {old["queries"]} -> {new["queries"]}'
+                )
+            if new['size'] > old['size'] * (1 + threshold):
+                problems.append(f'size {old["size"]} -> {new["size"]} B')
+            if problems:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: REGRESSION ' + ', '.join(problems)
+                ))
+            else:
+                self.stdout.write(
+                    f'{name}: ok, p95 {old["p95_ms"]:.2f} -> '
+                    f'{new["p95_ms"]:.2f} ms, queries {new["queries"]}'
+                )
+        if regressions:
+            raise CommandError(f'Обнаружены регрессии: {regressions}')
+        self.stdout.write(self.style.SUCCESS('No regressions'))
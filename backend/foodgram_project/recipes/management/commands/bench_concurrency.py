@@ -0,0 +1,164 @@
+import asyncio
+import json
+import time
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.benchmark import percentile
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?pagination=cursor',
+    '/api/tags/',
+    '/api/ingredients/?name=со',
+)
+DEFAULT_CONCURRENCY = (50, 100, 250, 500)
+
+
+async def fetch(host, port, path, headers, timeout):
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout
+    )
+    try:
+        request = (
+            f'GET {quote(path, safe="/?=&")} HTTP/1.1\r\nHost: {host}\r\n'
+            'Connection: close\r\nAccept: application/json\r\n'
+            + ''.join(f'{name}: {value}\r\n' for name, value in headers)
+            + '\r\n'
+        )
+        writer.write(request.encode())
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status_line = data.split(b'\r\n', 1)[0].split()
+    return int(status_line[1]) if len(status_line) > 1 else 0
+
+
+async def worker(target, paths, headers, deadline, timeout, samples, offset):
+    index = offset
+    while time.monotonic() < deadline:
+        path = target['prefix'] + paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            status = await fetch(
+                target['host'], target['port'], path, headers, timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            status = 0
+        latency = (time.perf_counter() - started) * 1000
+        if 200 <= status < 400:
+            samples['latency'].append(latency)
+        else:
+            samples['errors'] += 1
+
+
+async def run_level(target, paths, headers, concurrency, duration, timeout):
+    samples = {'latency': [], 'errors': 0}
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*(
+        worker(target, paths, headers, deadline, timeout, samples, offset)
+        for offset in range(concurrency)
+    ))
+    elapsed = time.monotonic() - started
+    latency = samples['latency']
+    return {
+        'concurrency': concurrency,
+        'requests': len(latency),
+        'errors': samples['errors'],
+        'rps': round(len(latency) / elapsed, 1),
+        'p50_ms': round(percentile(latency, 0.5) or 0, 2),
+        'p95_ms': round(percentile(latency, 0.95) or 0, 2),
+        'p99_ms': round(percentile(latency, 0.99) or 0, 2),
+    }
+
+
+def parse_target(value):
+    name, _, url = value.partition('=')
+    parts = urlsplit(url)
+    if not name or parts.scheme != 'http' or not parts.hostname:
+        raise CommandError(
+            f'Цель должна иметь вид NAME=http://host:port, получено {value}'
+        )
+    return {
+        'name': name,
+        'host': parts.hostname,
+        'port': parts.port or 80,
+        'prefix': parts.path.rstrip('/'),
+    }
+
+
+class Command(BaseCommand):
+    help = 'compare throughput of running deployments under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='deployment to load, NAME=http://host:port, repeatable'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='endpoint requested in turn, repeatable'
+        )
+        parser.add_argument(
+            '--concurrency',
+            nargs='+',
+            default=DEFAULT_CONCURRENCY,
+            type=int,
+            help='numbers of concurrent connections to test'
+        )
+        parser.add_argument(
+            '--duration',
+            default=10.0,
+            type=float,
+            help='seconds of load per concurrency level'
+        )
+        parser.add_argument(
+            '--timeout',
+            default=30.0,
+            type=float,
+            help='seconds before a request counts as an error'
+        )
+        parser.add_argument(
+            '--token',
+            help='auth token sent with every request'
+        )
+        parser.add_argument(
+            '--output',
+            help='write the JSON report to this file'
+        )
+
+    def handle(self, *args, **options):
+        targets = [parse_target(value) for value in options['target']]
+        paths = options['path'] or DEFAULT_PATHS
+        headers = []
+        if options['token']:
+            headers.append(('Authorization', f'Token {options["token"]}'))
+        report = {}
+        for target in targets:
+            report[target['name']] = []
+            for concurrency in options['concurrency']:
+                result = asyncio.run(run_level(
+                    target, paths, headers, concurrency,
+                    options['duration'], options['timeout']
+                ))
+                report[target['name']].append(result)
+                self.stdout.write(
+                    f'{target["name"]:>8} c={concurrency:<4} '
+                    f'{result["rps"]:>8.1f} req/s  '
+                    f'p50 {result["p50_ms"]:.1f} ms  '
+                    f'p99 {result["p99_ms"]:.1f} ms  '
+                    f'errors {result["errors"]}'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Report saved to {options["output"]}'
+            ))
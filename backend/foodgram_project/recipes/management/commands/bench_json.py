@@ -0,0 +1,123 @@
+import io
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONParser, ORJSONRenderer
+from recipes.benchmark import (DEFAULT_SEED_OPTIONS, benchmark_database,
+                               percentile, seed)
+from users.models import User
+
+PAYLOADS = (
+    ('recipes.list[limit=50]', '/api/recipes/?limit=50'),
+    ('recipes.list', '/api/recipes/'),
+    ('ingredients.list', '/api/ingredients/'),
+)
+BACKENDS = (
+    ('json', JSONRenderer, JSONParser),
+    ('orjson', ORJSONRenderer, ORJSONParser),
+)
+
+
+def timings(function, argument, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function(argument())
+        samples.append((time.perf_counter() - started) * 1000000)
+    return {
+        'median_us': round(statistics.median(samples), 1),
+        'p95_us': round(percentile(samples, 0.95), 1),
+    }
+
+
+class Command(BaseCommand):
+    help = 'compare stdlib and orjson rendering and parsing of api payloads'
+
+    def add_arguments(self, parser):
+        for option, default in DEFAULT_SEED_OPTIONS.items():
+            parser.add_argument(
+                '--' + option.replace('_', '-'),
+                default=default,
+                type=type(default),
+                help=f'dataset option, default {default}'
+            )
+        parser.add_argument(
+            '--iterations',
+            default=200,
+            type=int,
+            help='measured renders and parses per payload'
+        )
+        parser.add_argument(
+            '--output',
+            help='write the JSON report to this file'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше 0')
+        with benchmark_database():
+            seed({option: options[option] for option in DEFAULT_SEED_OPTIONS})
+            payloads = self.payloads()
+        report = {
+            name: self.measure(name, data, options['iterations'])
+            for name, data in payloads.items()
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Report saved to {options["output"]}'
+            ))
+
+    @staticmethod
+    def payloads():
+        viewer = User.objects.order_by('-id').first()
+        client = Client(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=viewer)}'
+        )
+        payloads = {}
+        for name, path in PAYLOADS:
+            response = client.get(path, HTTP_ACCEPT='application/json')
+            if response.status_code != 200:
+                raise CommandError(f'{path} ответил {response.status_code}')
+            payloads[name] = response.data
+        return payloads
+
+    def measure(self, name, data, iterations):
+        expected = JSONRenderer().render(data)
+        result = {'size': len(expected)}
+        for backend, renderer_class, parser_class in BACKENDS:
+            renderer, parser = renderer_class(), parser_class()
+            if renderer.render(data) != expected:
+                raise CommandError(
+                    f'{name}: {backend} выдаёт JSON, отличный от stdlib'
+                )
+            if parser.parse(io.BytesIO(expected)) != json.loads(expected):
+                raise CommandError(
+                    f'{name}: {backend} разбирает JSON иначе, чем stdlib'
+                )
+            result[backend] = {
+                'render': timings(
+                    renderer.render, lambda: data, iterations
+                ),
+                'parse': timings(
+                    parser.parse, lambda: io.BytesIO(expected), iterations
+                ),
+            }
+        for stage in ('render', 'parse'):
+            baseline = result['json'][stage]['median_us']
+            current = result['orjson'][stage]['median_us']
+            result[f'{stage}_speedup'] = round(baseline / current, 1)
+            self.stdout.write(
+                f'{name:<24} {stage:<6} json {baseline:>9.1f} us  '
+                f'orjson {current:>8.1f} us  '
+                f'x{result[f"{stage}_speedup"]}  ({result["size"]} B)'
+            )
+        return result
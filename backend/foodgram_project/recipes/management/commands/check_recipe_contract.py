@@ -0,0 +1,161 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.benchmark import DEFAULT_SEED_OPTIONS, benchmark_database, seed
+from recipes.models import Recipe, Tag
+from users.models import User
+
+ORDERS = (
+    ('reference', False, True),
+    ('fast', True, False),
+    ('fast', True, True),
+    ('reference', False, False),
+)
+
+
+def fetch(client, path, fast):
+    with override_settings(RECIPE_FAST_READ=fast):
+        response = client.get(path, HTTP_ACCEPT='application/json')
+    if response.status_code != 200:
+        raise CommandError(f'{path} ответил {response.status_code}')
+    return response.content
+
+
+def difference(expected, actual):
+    position = next(
+        (
+            index for index, (left, right) in enumerate(zip(expected, actual))
+            if left != right
+        ),
+        min(len(expected), len(actual))
+    )
+    start = max(position - 40, 0)
+    return (
+        f'byte {position}: {expected[start:position + 40]!r} != '
+        f'{actual[start:position + 40]!r}'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'check that the fast recipe read path returns the same bytes as '
+        'RecipeSerializer and compare their CPU time'
+    )
+
+    def add_arguments(self, parser):
+        for option, default in DEFAULT_SEED_OPTIONS.items():
+            parser.add_argument(
+                '--' + option.replace('_', '-'),
+                default=default,
+                type=type(default),
+                help=f'dataset option, default {default}'
+            )
+        parser.add_argument(
+            '--page-size',
+            default=100,
+            type=int,
+            help='recipes per page in the CPU comparison'
+        )
+        parser.add_argument(
+            '--iterations',
+            default=20,
+            type=int,
+            help='measured responses per path in the CPU comparison'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['page_size'] < 1:
+            raise CommandError(
+                '--iterations и --page-size должны быть больше 0'
+            )
+        with benchmark_database():
+            seed({option: options[option] for option in DEFAULT_SEED_OPTIONS})
+            viewer = User.objects.order_by('-id').first()
+            clients = {
+                'anonymous': Client(),
+                'user': Client(HTTP_AUTHORIZATION=(
+                    f'Token {Token.objects.create(user=viewer)}'
+                )),
+            }
+            mismatches = self.check_contract(clients, self.paths())
+            self.compare_cpu(
+                clients['user'], options['page_size'], options['iterations']
+            )
+        if mismatches:
+            raise CommandError(f'Ответы различаются: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Responses are byte-identical'))
+
+    @staticmethod
+    def paths():
+        recipes = Recipe.objects.order_by('-favorites_count')
+        tags = '&'.join(
+            f'tags={slug}'
+            for slug in Tag.objects.values_list('slug', flat=True)[:2]
+        )
+        return [
+            ('/api/recipes/', False),
+            ('/api/recipes/?limit=50&page=2', False),
+            (f'/api/recipes/?{tags}', False),
+            ('/api/recipes/?search=суп', False),
+            ('/api/recipes/?pagination=cursor&limit=20', False),
+            ('/api/recipes/?is_favorited=1', True),
+            ('/api/recipes/?is_in_shopping_cart=1', True),
+            ('/api/feed/?limit=20', True),
+        ] + [
+            (f'/api/recipes/{pk}/', False)
+            for pk in recipes.values_list('id', flat=True)[:5]
+        ]
+
+    def check_contract(self, clients, paths):
+        mismatches = 0
+        for path, private in paths:
+            for viewer, client in clients.items():
+                if private and viewer == 'anonymous':
+                    continue
+                responses = []
+                for name, fast, clear in ORDERS:
+                    if clear:
+                        cache.clear()
+                    responses.append((name, fetch(client, path, fast)))
+                expected = responses[0][1]
+                problems = [
+                    f'{name}: {difference(expected, content)}'
+                    for name, content in responses[1:]
+                    if content != expected
+                ]
+                if problems:
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'{viewer} {path}: ' + '; '.join(problems)
+                    ))
+                else:
+                    self.stdout.write(
+                        f'{viewer} {path}: ok, {len(expected)} B'
+                    )
+        return mismatches
+
+    def compare_cpu(self, client, page_size, iterations):
+        path = f'/api/recipes/?limit={page_size}'
+        for state in ('cold', 'warm'):
+            results = {}
+            for name, fast in (('reference', False), ('fast', True)):
+                fetch(client, path, fast)
+                samples = []
+                for _ in range(iterations):
+                    if state == 'cold':
+                        cache.clear()
+                    started = time.process_time()
+                    fetch(client, path, fast)
+                    samples.append((time.process_time() - started) * 1000)
+                results[name] = statistics.median(samples)
+            self.stdout.write(
+                f'{path} {state} cache: reference '
+                f'{results["reference"]:.2f} ms, fast '
+                f'{results["fast"]:.2f} ms CPU, '
+                f'x{results["reference"] / results["fast"]:.1f}'
+            )
@@ -1,16 +1,43 @@
 import csv
+import json
 import os
+import time
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.cache import bump_version
 from recipes.models import Ingredient
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+FORMATS = ('csv', 'json')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row
+
+
+def read_json(file):
+    items = json.load(file)
+    if not isinstance(items, list):
+        raise ValueError('ожидается список ингредиентов')
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f'ожидается объект, получено {item!r}')
+        yield item.get('name'), item.get('measurement_unit')
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
 
 
 class Command(BaseCommand):
-    help = 'loading ingredient from data in csv'
+    help = 'loading ingredient from data in csv or json'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -19,18 +46,100 @@ class Command(BaseCommand):
             nargs='?',
             type=str
         )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='file format, detected by extension if omitted'
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=1000,
+            type=int,
+            help='number of rows inserted per query'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='show what would be added without writing to the database'
+        )
+
+    def read_rows(self, path, file_format):
+        with open(path, 'r', encoding='utf-8') as file:
+            try:
+                for line, row in enumerate(READERS[file_format](file), 1):
+                    yield self.parse_row(line, row)
+            except (AttributeError, TypeError, ValueError) as error:
+                raise CommandError(f'Некорректный файл {path}: {error}')
+
+    @staticmethod
+    def parse_row(line, row):
+        try:
+            name, measurement_unit = row
+            name, measurement_unit = name.strip(), measurement_unit.strip()
+        except (AttributeError, TypeError, ValueError):
+            raise CommandError(f'Некорректная строка {line}: {row}')
+        if not name or not measurement_unit:
+            raise CommandError(f'Некорректная строка {line}: {row}')
+        return name, measurement_unit
 
     def handle(self, *args, **options):
+        path = os.path.join(DATA_ROOT, options['filename'])
+        file_format = (
+            options['format']
+            or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in FORMATS:
+            raise CommandError(
+                'Укажите формат файла: --format ' + '|'.join(FORMATS)
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        existing = set(
+            Ingredient.objects.values_list(
+                'name', 'measurement_unit'
+            ).iterator()
+        )
         try:
-            with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as f:
-                data = csv.reader(f)
-                for row in data:
-                    name, measurement_unit = row
-                    Ingredient.objects.get_or_create(
-                        name=name,
-                        measurement_unit=measurement_unit
-                    )
-                print('Load ingredients.csv have successful finished')
+            new_rows = []
+            total = 0
+            for pair in self.read_rows(path, file_format):
+                total += 1
+                if pair not in existing:
+                    existing.add(pair)
+                    new_rows.append(pair)
         except FileNotFoundError:
             raise CommandError('Добавьте файл ingredients в директорию data')
+        self.stdout.write(
+            f'Rows in file: {total}, new: {len(new_rows)}, '
+            f'already loaded or duplicated: {total - len(new_rows)}'
+        )
+        if options['dry_run']:
+            for name, measurement_unit in new_rows:
+                self.stdout.write(f'+ {name} ({measurement_unit})')
+            return
+        self.load(new_rows, options['batch_size'])
+
+    def load(self, rows, batch_size):
+        started = time.monotonic()
+        with transaction.atomic():
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                Ingredient.objects.bulk_create(
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                )
+                loaded = start + len(batch)
+                self.stdout.write(
+                    f'Loaded {loaded}/{len(rows)} '
+                    f'({self.rate(loaded, started):.0f} rows/s)'
+                )
+        if rows:
+            bump_version(Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Load {len(rows)} ingredients have successful finished '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
+
+    @staticmethod
+    def rate(rows, started):
+        return rows / max(time.monotonic() - started, 1e-6)
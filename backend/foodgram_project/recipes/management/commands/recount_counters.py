@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, recount_counters
+
+
+class Command(BaseCommand):
+    help = 'recompute denormalized recipe and user counters'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_counters()
+        self.stdout.write(self.style.SUCCESS(
+            'Recounted: ' + ', '.join(
+                f'{model._meta.model_name}.{field}'
+                for model, field, *_ in COUNTERS
+            )
+        ))
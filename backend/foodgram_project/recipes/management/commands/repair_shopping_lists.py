@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import repair_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'check shopping list aggregates against carts and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            default=500,
+            type=int,
+            help='number of users checked per query'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='only report drift without writing to the database'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+        created = updated = deleted = 0
+        for start in range(0, len(user_ids), batch_size):
+            with transaction.atomic():
+                batch = repair_shopping_lists(
+                    user_ids[start:start + batch_size],
+                    dry_run=options['dry_run']
+                )
+            created += batch[0]
+            updated += batch[1]
+            deleted += batch[2]
+        message = (
+            f'Users checked: {len(user_ids)}, missing: {created}, '
+            f'wrong amount: {updated}, stale: {deleted}'
+        )
+        if options['dry_run'] or not created + updated + deleted:
+            self.stdout.write(message)
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired. {message}'))
@@ -0,0 +1,48 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+
+
+def fts_query(value):
+    words = re.findall(r'\w+', value)
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def search_recipes(queryset, value):
+    value = value.strip()
+    if not value:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        query = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        queryset = queryset.annotate(
+            search_match=RawSQL(
+                f'recipes_recipe.search_vector @@ {query}',
+                (value,),
+                output_field=BooleanField()
+            ),
+            search_rank=RawSQL(
+                f'ts_rank(recipes_recipe.search_vector, {query})',
+                (value,),
+                output_field=FloatField()
+            )
+        ).filter(search_match=True)
+    else:
+        query = fts_query(value)
+        if not query:
+            return queryset.none()
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (query,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = recipes_recipe.id',
+            (query,),
+            output_field=FloatField()
+        ))
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
@@ -0,0 +1,95 @@
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.models import IngredientRecipe, ShoppingListItem
+
+BATCH_SIZE = 1000
+
+
+def recipe_amounts(recipe_ids, sign=1):
+    return {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id').annotate(
+            amount=Sum('amount')
+        ).values_list('ingredient_id', 'amount').order_by()
+    }
+
+
+def change_shopping_list(user_ids, deltas):
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, total_amount=0
+            )
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items() if delta > 0
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=list(deltas)
+    )
+    items.update(total_amount=Greatest(
+        F('total_amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            output_field=IntegerField()
+        ),
+        0
+    ))
+    items.filter(total_amount=0).delete()
+
+
+def expected_shopping_lists(user_ids):
+    user_field = 'recipe__shoppingcarts__user_id'
+    rows = IngredientRecipe.objects.filter(
+        **{f'{user_field}__in': user_ids}
+    ).values(user_field, 'ingredient_id').annotate(
+        total_amount=Sum('amount')
+    ).values_list(user_field, 'ingredient_id', 'total_amount').order_by()
+    return {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount in rows
+    }
+
+
+def repair_shopping_lists(user_ids, dry_run=False):
+    expected = expected_shopping_lists(user_ids)
+    stored = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.filter(user_id__in=user_ids)
+    }
+    to_create = [
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id,
+            total_amount=total_amount
+        )
+        for (user_id, ingredient_id), total_amount in expected.items()
+        if (user_id, ingredient_id) not in stored
+    ]
+    to_update = []
+    to_delete = []
+    for key, item in stored.items():
+        if key not in expected:
+            to_delete.append(item.id)
+        elif item.total_amount != expected[key]:
+            item.total_amount = expected[key]
+            to_update.append(item)
+    if not dry_run:
+        ShoppingListItem.objects.filter(id__in=to_delete).delete()
+        ShoppingListItem.objects.bulk_update(
+            to_update, ('total_amount',), batch_size=BATCH_SIZE
+        )
+        ShoppingListItem.objects.bulk_create(
+            to_create, batch_size=BATCH_SIZE
+        )
+    return len(to_create), len(to_update), len(to_delete)
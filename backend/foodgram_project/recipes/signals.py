@@ -0,0 +1,54 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from recipes.counters import COUNTERS, change_counter
+from recipes.feed import backfill_feed, prune_feed
+from recipes.models import ShoppingCart, Subscribe
+from recipes.shopping_list import change_shopping_list, recipe_amounts
+
+
+def connect_counter(model, field, related_model, related_field):
+    attname = related_model._meta.get_field(related_field).attname
+
+    def increment(sender, instance, created, **kwargs):
+        if created:
+            change_counter(model, [getattr(instance, attname)], field, 1)
+
+    def decrement(sender, instance, **kwargs):
+        change_counter(model, [getattr(instance, attname)], field, -1)
+
+    post_save.connect(increment, sender=related_model, weak=False)
+    post_delete.connect(decrement, sender=related_model, weak=False)
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        change_shopping_list(
+            [instance.user_id], recipe_amounts([instance.recipe_id])
+        )
+
+
+def remove_from_shopping_list(sender, instance, **kwargs):
+    change_shopping_list(
+        [instance.user_id], recipe_amounts([instance.recipe_id], -1)
+    )
+
+
+post_save.connect(add_to_shopping_list, sender=ShoppingCart)
+pre_delete.connect(remove_from_shopping_list, sender=ShoppingCart)
+
+
+def add_to_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, instance.subscribing_id)
+
+
+def remove_from_feed(sender, instance, **kwargs):
+    prune_feed(instance.user_id, instance.subscribing_id)
+
+
+post_save.connect(add_to_feed, sender=Subscribe)
+post_delete.connect(remove_from_feed, sender=Subscribe)
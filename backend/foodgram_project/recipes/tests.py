@@ -0,0 +1,35 @@
+import io
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+
+class DataLoadTest(TestCase):
+    def load(self, content, suffix='.json'):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix=suffix, encoding='utf-8', delete=False
+        ) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        call_command(
+            'data_load', file.name, '--dry-run', stdout=io.StringIO()
+        )
+
+    def test_bad_input_raises_command_error(self):
+        for content, suffix in (
+            ('{"a": 1}', '.json'),
+            ('[{"name": "соль"', '.json'),
+            ('1', '.json'),
+            ('["соль", "г"]', '.json'),
+            ('[{"name": 5, "measurement_unit": "г"}]', '.json'),
+            ('[{"name": "соль"}]', '.json'),
+            ('соль\n', '.csv'),
+        ):
+            with self.subTest(content=content):
+                with self.assertRaises(CommandError):
+                    self.load(content, suffix)
+
+    def test_valid_json(self):
+        self.load('[{"name": "соль", "measurement_unit": "г"}]')
@@ -1,54 +1,152 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
 from users.models import User
 
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    (queryset.model._meta.db_table,)
+                )
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    template = 'admin/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = self.field_name
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field(self.field_name)
+        choice_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model.objects.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False
+        )
+        try:
+            self.selected = choice_field.clean(self.value())
+        except ValidationError:
+            self.selected = None
+        self.rendered_widget = choice_field.widget.render(
+            self.parameter_name, getattr(self.selected, 'pk', None)
+        )
+
+    @classmethod
+    def media(cls, model_admin):
+        field = model_admin.model._meta.get_field(cls.field_name)
+        return AutocompleteSelect(field, model_admin.admin_site).media
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.selected is not None:
+            return queryset.filter(**{self.field_name: self.selected})
+        return queryset
+
+
+class AuthorFilter(AutocompleteFilter):
+    title = 'Автор'
+    field_name = 'author'
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, type) and issubclass(
+                list_filter, AutocompleteFilter
+            ):
+                media += list_filter.media(self)
+        return media
+
+
+class IngredientRecipeForm(forms.ModelForm):
+    def validate_unique(self):
+        pass
+
 
 class IngredientRecipeInline(admin.TabularInline):
     model = IngredientRecipe
+    form = IngredientRecipeForm
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     list_display = (
         'username',
         'email',
         'first_name',
         'last_name',
-        'role'
+        'role',
+        'recipes_count',
+        'subscribers_count'
     )
-    list_filter = ('email', 'username')
+    list_filter = ('role',)
+    ordering = ('id',)
+    search_fields = ('username', 'email', 'first_name', 'last_name')
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = (
         'name',
         'author',
         'favorite_count',
     )
     list_filter = (
-        'author',
-        'name',
+        AuthorFilter,
         'tags'
     )
+    list_select_related = ('author',)
+    search_fields = ('name',)
+    autocomplete_fields = ('author',)
     inlines = [IngredientRecipeInline]
 
     def favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
     favorite_count.short_description = 'число добавлений в избранное'
+    favorite_count.admin_order_field = 'favorites_count'
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     list_display = (
         'name',
         'measurement_unit',
     )
-    list_filter = (
-        'name',
-    )
+    search_fields = ('name',)
 
 
 @admin.register(Tag)
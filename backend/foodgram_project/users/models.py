@@ -47,6 +47,18 @@ class User(AbstractUser):
         default=USER,
         verbose_name='Роль',
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name='Число рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name='Число подписчиков'
+    )
 
     def __str__(self):
         return self.username